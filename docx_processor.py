@@ -1,9 +1,10 @@
 import io
 import textwrap
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple, Union
 
 from docx import Document  # python-docx
 from docx.opc.constants import RELATIONSHIP_TYPE as RT
+from docx.text.run import Run
 
 from PIL import Image, ImageDraw, ImageFont
 
@@ -31,16 +32,25 @@ class DocxProcessor:
     # ---------------------------------------------------------
     # TEXT: collect RUN-level segments
     # ---------------------------------------------------------
-    def _collect_segments(self, doc: Document) -> List[Dict[str, str]]:
+    def _collect_segments(
+        self, doc: Document
+    ) -> Tuple[List[Dict[str, str]], List[Tuple[str, Run]]]:
+        """
+        Returns the segments for the API and the (seg_id, run) pairs they came
+        from, so that _apply_text_translations is a single pass over the
+        collected runs instead of a second document walk.
+        """
         segments: List[Dict[str, str]] = []
+        segment_runs: List[Tuple[str, Run]] = []
 
         # 1) Body paragraphs
         for p_idx, para in enumerate(doc.paragraphs):
             for r_idx, run in enumerate(para.runs):
                 text = run.text
-                if text and text.strip():
-                    seg_id = f"p-{p_idx}-r-{r_idx}"
+                if text and not text.isspace():
+                    seg_id = f"p{p_idx}r{r_idx}"
                     segments.append({"id": seg_id, "text": text})
+                    segment_runs.append((seg_id, run))
 
         # 2) Body tables (cells)
         for t_idx, table in enumerate(doc.tables):
@@ -49,12 +59,13 @@ class DocxProcessor:
                     for p_idx, para in enumerate(cell.paragraphs):
                         for r_idx, run in enumerate(para.runs):
                             text = run.text
-                            if text and text.strip():
+                            if text and not text.isspace():
                                 seg_id = (
-                                    f"tbl-{t_idx}-row-{row_idx}-col-{col_idx}-"
-                                    f"p-{p_idx}-r-{r_idx}"
+                                    f"t{t_idx}.{row_idx}.{col_idx}"
+                                    f"p{p_idx}r{r_idx}"
                                 )
                                 segments.append({"id": seg_id, "text": text})
+                                segment_runs.append((seg_id, run))
 
         # 3) Headers & Footers (paragraphs + tables)
         for sec_idx, section in enumerate(doc.sections):
@@ -65,9 +76,10 @@ class DocxProcessor:
             for p_idx, para in enumerate(header.paragraphs):
                 for r_idx, run in enumerate(para.runs):
                     text = run.text
-                    if text and text.strip():
-                        seg_id = f"hdr-{sec_idx}-p-{p_idx}-r-{r_idx}"
+                    if text and not text.isspace():
+                        seg_id = f"h{sec_idx}p{p_idx}r{r_idx}"
                         segments.append({"id": seg_id, "text": text})
+                        segment_runs.append((seg_id, run))
 
             # Header tables
             for t_idx, table in enumerate(header.tables):
@@ -76,20 +88,22 @@ class DocxProcessor:
                         for p_idx, para in enumerate(cell.paragraphs):
                             for r_idx, run in enumerate(para.runs):
                                 text = run.text
-                                if text and text.strip():
+                                if text and not text.isspace():
                                     seg_id = (
-                                        f"hdrtbl-{sec_idx}-t-{t_idx}-row-{row_idx}-"
-                                        f"col-{col_idx}-p-{p_idx}-r-{r_idx}"
+                                        f"h{sec_idx}t{t_idx}.{row_idx}.{col_idx}"
+                                        f"p{p_idx}r{r_idx}"
                                     )
                                     segments.append({"id": seg_id, "text": text})
+                                    segment_runs.append((seg_id, run))
 
             # Footer paragraphs
             for p_idx, para in enumerate(footer.paragraphs):
                 for r_idx, run in enumerate(para.runs):
                     text = run.text
-                    if text and text.strip():
-                        seg_id = f"ftr-{sec_idx}-p-{p_idx}-r-{r_idx}"
+                    if text and not text.isspace():
+                        seg_id = f"f{sec_idx}p{p_idx}r{r_idx}"
                         segments.append({"id": seg_id, "text": text})
+                        segment_runs.append((seg_id, run))
 
             # Footer tables
             for t_idx, table in enumerate(footer.tables):
@@ -98,103 +112,25 @@ class DocxProcessor:
                         for p_idx, para in enumerate(cell.paragraphs):
                             for r_idx, run in enumerate(para.runs):
                                 text = run.text
-                                if text and text.strip():
+                                if text and not text.isspace():
                                     seg_id = (
-                                        f"ftrtbl-{sec_idx}-t-{t_idx}-row-{row_idx}-"
-                                        f"col-{col_idx}-p-{p_idx}-r-{r_idx}"
+                                        f"f{sec_idx}t{t_idx}.{row_idx}.{col_idx}"
+                                        f"p{p_idx}r{r_idx}"
                                     )
                                     segments.append({"id": seg_id, "text": text})
+                                    segment_runs.append((seg_id, run))
 
         logger.info(f"[docx] Collected {len(segments)} text segments from DOCX.")
-        return segments
+        return segments, segment_runs
 
     def _apply_text_translations(
         self,
-        doc: Document,
+        segment_runs: List[Tuple[str, Run]],
         id_to_translation: Dict[str, str],
     ) -> None:
-        # 1) Body paragraphs
-        for p_idx, para in enumerate(doc.paragraphs):
-            for r_idx, run in enumerate(para.runs):
-                text = run.text
-                if not text or not text.strip():
-                    continue
-                seg_id = f"p-{p_idx}-r-{r_idx}"
-                if seg_id in id_to_translation:
-                    run.text = id_to_translation[seg_id]
-
-        # 2) Body tables
-        for t_idx, table in enumerate(doc.tables):
-            for row_idx, row in enumerate(table.rows):
-                for col_idx, cell in enumerate(row.cells):
-                    for p_idx, para in enumerate(cell.paragraphs):
-                        for r_idx, run in enumerate(para.runs):
-                            text = run.text
-                            if not text or not text.strip():
-                                continue
-                            seg_id = (
-                                f"tbl-{t_idx}-row-{row_idx}-col-{col_idx}-"
-                                f"p-{p_idx}-r-{r_idx}"
-                            )
-                            if seg_id in id_to_translation:
-                                run.text = id_to_translation[seg_id]
-
-        # 3) Headers & Footers
-        for sec_idx, section in enumerate(doc.sections):
-            header = section.header
-            footer = section.footer
-
-            # Header paragraphs
-            for p_idx, para in enumerate(header.paragraphs):
-                for r_idx, run in enumerate(para.runs):
-                    text = run.text
-                    if not text or not text.strip():
-                        continue
-                    seg_id = f"hdr-{sec_idx}-p-{p_idx}-r-{r_idx}"
-                    if seg_id in id_to_translation:
-                        run.text = id_to_translation[seg_id]
-
-            # Header tables
-            for t_idx, table in enumerate(header.tables):
-                for row_idx, row in enumerate(table.rows):
-                    for col_idx, cell in enumerate(row.cells):
-                        for p_idx, para in enumerate(cell.paragraphs):
-                            for r_idx, run in enumerate(para.runs):
-                                text = run.text
-                                if not text or not text.strip():
-                                    continue
-                                seg_id = (
-                                    f"hdrtbl-{sec_idx}-t-{t_idx}-row-{row_idx}-"
-                                    f"col-{col_idx}-p-{p_idx}-r-{r_idx}"
-                                )
-                                if seg_id in id_to_translation:
-                                    run.text = id_to_translation[seg_id]
-
-            # Footer paragraphs
-            for p_idx, para in enumerate(footer.paragraphs):
-                for r_idx, run in enumerate(para.runs):
-                    text = run.text
-                    if not text or not text.strip():
-                        continue
-                    seg_id = f"ftr-{sec_idx}-p-{p_idx}-r-{r_idx}"
-                    if seg_id in id_to_translation:
-                        run.text = id_to_translation[seg_id]
-
-            # Footer tables
-            for t_idx, table in enumerate(footer.tables):
-                for row_idx, row in enumerate(table.rows):
-                    for col_idx, cell in enumerate(row.cells):
-                        for p_idx, para in enumerate(cell.paragraphs):
-                            for r_idx, run in enumerate(para.runs):
-                                text = run.text
-                                if not text or not text.strip():
-                                    continue
-                                seg_id = (
-                                    f"ftrtbl-{sec_idx}-t-{t_idx}-row-{row_idx}-"
-                                    f"col-{col_idx}-p-{p_idx}-r-{r_idx}"
-                                )
-                                if seg_id in id_to_translation:
-                                    run.text = id_to_translation[seg_id]
+        for seg_id, run in segment_runs:
+            if seg_id in id_to_translation:
+                run.text = id_to_translation[seg_id]
 
     # ---------------------------------------------------------
     # IMAGES: markdown-table parser + GPT-4.1 vision + redraw
@@ -428,23 +364,23 @@ class DocxProcessor:
     def translate_document(
         self,
         filename: str,
-        content_bytes: bytes,
+        content: Union[bytes, io.BytesIO],
         target_language: Optional[str] = None,
         target_dialect: Optional[str] = None,
     ) -> bytes:
         logger.info(f"Translating DOCX document (text + images): {filename}")
-        doc_stream = io.BytesIO(content_bytes)
+        doc_stream = content if isinstance(content, io.BytesIO) else io.BytesIO(content)
         doc = Document(doc_stream)
 
         # 1) Text (runs)
-        segments = self._collect_segments(doc)
+        segments, segment_runs = self._collect_segments(doc)
         if segments:
             id_to_translation = self.oai_client.translate_segments(
                 segments,
                 target_language=target_language,
                 target_dialect=target_dialect,
             )
-            self._apply_text_translations(doc, id_to_translation)
+            self._apply_text_translations(segment_runs, id_to_translation)
         else:
             logger.info("No text segments found in DOCX body text / headers / footers.")
 
@@ -461,5 +397,5 @@ class DocxProcessor:
         # 3) Save final DOCX
         out_stream = io.BytesIO()
         doc.save(out_stream)
-        out_stream.seek(0)
-        return out_stream.read()
+        # getvalue() hands back the buffer without a seek + read() copy
+        return out_stream.getvalue()
@@ -52,16 +52,16 @@ def main():
                     logger.warning(f"Could not determine page count for {file}: {e}")
                     logger.info(f"Processing file: {file}...")
 
-                extension = os.path.splitext(file)[1].lower()
+                extension = UtilityFunctions.get_extension(file)
 
-                # Download content bytes once
-                content_bytes = utils.download_blob_bytes(file)
+                # Download content once, streamed straight into an in-memory buffer
+                content_stream = utils.download_blob_stream(file)
 
                 # Decide which translator to use in MAIN (not inside translators)
                 if extension == ".pdf":
                     translated_bytes = pdf_processor.translate_document(
                         file,
-                        content_bytes,
+                        content_stream,
                         target_language=cfg.target_language,
                         target_dialect=cfg.target_dialect,
                     )
@@ -70,7 +70,7 @@ def main():
                     print(f"Processing a **PPTX** file: **{file}**")
                     translated_bytes = pptx_processor.translate_document(
                         file,
-                        content_bytes,
+                        content_stream,
                         target_language=cfg.target_language,
                         target_dialect=cfg.target_dialect,
                     )
@@ -79,7 +79,7 @@ def main():
                     print(f"Processing a **DOCX** file: **{file}**")
                     translated_bytes = docx_processor.translate_document(
                         file,
-                        content_bytes,
+                        content_stream,
                         target_language=cfg.target_language,
                         target_dialect=cfg.target_dialect,
                     )
@@ -1,5 +1,5 @@
 import io
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Optional, Tuple, Union
 
 import fitz  # PyMuPDF
 
@@ -179,7 +179,7 @@ class PdfProcessor:
     def translate_document(
         self,
         filename: str,
-        content_bytes: bytes,
+        content: Union[bytes, io.BytesIO],
         target_language: Optional[str] = None,
         target_dialect: Optional[str] = None,
     ) -> bytes:
@@ -187,13 +187,13 @@ class PdfProcessor:
             f"Translating PDF document (overlay on original background): {filename}"
         )
 
-        doc = fitz.open(stream=content_bytes, filetype="pdf")
+        doc = fitz.open(stream=content, filetype="pdf")
 
         # Collect spans
         segments, span_meta = self._collect_spans(doc)
         if not segments:
             logger.info("[pdf] No text spans found; returning original PDF unchanged.")
-            out = content_bytes
+            out = content.getvalue() if isinstance(content, io.BytesIO) else content
             doc.close()
             return out
 
@@ -1,12 +1,18 @@
 import io
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Union
 
 from pptx import Presentation  # python-pptx
 from pptx.enum.shapes import MSO_SHAPE_TYPE
+from pptx.oxml.ns import qn
 
 from spanish_translator_oai_client import OaiClient
 from spanish_translator_logger import logger
 
+# Per-slide probes: most decks have no tables or groups on most slides, and
+# then the per-shape has_table / shape_type checks can be skipped entirely.
+_ANY_TABLE = ".//" + qn("a:tbl")
+_ANY_GROUP = ".//" + qn("p:grpSp")
+
 
 class PptxProcessor:
     def __init__(self, oai_client: OaiClient):
@@ -34,6 +40,8 @@ class PptxProcessor:
         segments: List[Dict[str, str]],
         s_idx: int,
         shape_path: str,
+        has_tables: bool = True,
+        has_groups: bool = True,
     ) -> None:
         """
         Recursively collect run-level text segments from a shape and any nested shapes
@@ -46,12 +54,12 @@ class PptxProcessor:
                 for p_idx, paragraph in enumerate(text_frame.paragraphs):
                     for r_idx, run in enumerate(paragraph.runs):
                         text = run.text
-                        if text and text.strip():
+                        if text and not text.isspace():
                             seg_id = f"s-{s_idx}-{shape_path}-p-{p_idx}-r-{r_idx}"
                             segments.append({"id": seg_id, "text": text})
 
         # 2) Tables inside shapes
-        if getattr(shape, "has_table", False):
+        if has_tables and getattr(shape, "has_table", False):
             table = shape.table
             if table is not None:
                 for row_idx, row in enumerate(table.rows):
@@ -62,7 +70,7 @@ class PptxProcessor:
                         for p_idx, paragraph in enumerate(text_frame.paragraphs):
                             for r_idx, run in enumerate(paragraph.runs):
                                 text = run.text
-                                if text and text.strip():
+                                if text and not text.isspace():
                                     seg_id = (
                                         f"s-{s_idx}-{shape_path}-tbl-row-"
                                         f"{row_idx}-col-{col_idx}-p-{p_idx}-r-{r_idx}"
@@ -72,10 +80,10 @@ class PptxProcessor:
         # 3) Group shapes → recurse into children
         # (They have shape_type == GROUP and a .shapes collection.)
         try:
-            if shape.shape_type == MSO_SHAPE_TYPE.GROUP:
+            if has_groups and shape.shape_type == MSO_SHAPE_TYPE.GROUP:
                 for g_idx, subshape in enumerate(shape.shapes):
                     sub_path = f"{shape_path}-g-{g_idx}"
-                    self._collect_from_shape(subshape, segments, s_idx, sub_path)
+                    self._collect_from_shape(subshape, segments, s_idx, sub_path, has_tables, has_groups)
         except Exception:
             # Some shapes may not expose .shape_type or .shapes cleanly
             pass
@@ -94,9 +102,11 @@ class PptxProcessor:
         segments: List[Dict[str, str]] = []
 
         for s_idx, slide in enumerate(pres.slides):
+            has_tables = slide._element.find(_ANY_TABLE) is not None
+            has_groups = slide._element.find(_ANY_GROUP) is not None
             for sh_idx, shape in enumerate(slide.shapes):
                 shape_path = f"sh-{sh_idx}"
-                self._collect_from_shape(shape, segments, s_idx, shape_path)
+                self._collect_from_shape(shape, segments, s_idx, shape_path, has_tables, has_groups)
 
         logger.info(f"[pptx] Collected {len(segments)} text segments from PPTX.")
         return segments
@@ -110,6 +120,8 @@ class PptxProcessor:
         id_to_translation: Dict[str, str],
         s_idx: int,
         shape_path: str,
+        has_tables: bool = True,
+        has_groups: bool = True,
     ) -> None:
         """
         Recursively walk a shape (and nested shapes) and update run.text
@@ -123,14 +135,14 @@ class PptxProcessor:
                 for p_idx, paragraph in enumerate(text_frame.paragraphs):
                     for r_idx, run in enumerate(paragraph.runs):
                         text = run.text
-                        if not text or not text.strip():
+                        if not text or text.isspace():
                             continue
                         seg_id = f"s-{s_idx}-{shape_path}-p-{p_idx}-r-{r_idx}"
                         if seg_id in id_to_translation:
                             run.text = id_to_translation[seg_id]
 
         # 2) Table text
-        if getattr(shape, "has_table", False):
+        if has_tables and getattr(shape, "has_table", False):
             table = shape.table
             if table is not None:
                 for row_idx, row in enumerate(table.rows):
@@ -141,7 +153,7 @@ class PptxProcessor:
                         for p_idx, paragraph in enumerate(text_frame.paragraphs):
                             for r_idx, run in enumerate(paragraph.runs):
                                 text = run.text
-                                if not text or not text.strip():
+                                if not text or text.isspace():
                                     continue
                                 seg_id = (
                                     f"s-{s_idx}-{shape_path}-tbl-row-"
@@ -152,10 +164,10 @@ class PptxProcessor:
 
         # 3) Group shapes → recurse into children
         try:
-            if shape.shape_type == MSO_SHAPE_TYPE.GROUP:
+            if has_groups and shape.shape_type == MSO_SHAPE_TYPE.GROUP:
                 for g_idx, subshape in enumerate(shape.shapes):
                     sub_path = f"{shape_path}-g-{g_idx}"
-                    self._apply_to_shape(subshape, id_to_translation, s_idx, sub_path)
+                    self._apply_to_shape(subshape, id_to_translation, s_idx, sub_path, has_tables, has_groups)
         except Exception:
             pass
 
@@ -171,9 +183,11 @@ class PptxProcessor:
         Walk the PPT structure again and update run.text where we have translations.
         """
         for s_idx, slide in enumerate(pres.slides):
+            has_tables = slide._element.find(_ANY_TABLE) is not None
+            has_groups = slide._element.find(_ANY_GROUP) is not None
             for sh_idx, shape in enumerate(slide.shapes):
                 shape_path = f"sh-{sh_idx}"
-                self._apply_to_shape(shape, id_to_translation, s_idx, shape_path)
+                self._apply_to_shape(shape, id_to_translation, s_idx, shape_path, has_tables, has_groups)
 
     # ------------------------------------------------------------------
     # Public entrypoint
@@ -181,19 +195,19 @@ class PptxProcessor:
     def translate_document(
         self,
         filename: str,
-        content_bytes: bytes,
+        content: Union[bytes, io.BytesIO],
         target_language: Optional[str] = None,
         target_dialect: Optional[str] = None,
     ) -> bytes:
         logger.info(f"Translating PPTX document: {filename}")
-        pres_stream = io.BytesIO(content_bytes)
+        pres_stream = content if isinstance(content, io.BytesIO) else io.BytesIO(content)
         pres = Presentation(pres_stream)
 
         # 1) Collect run-level segments (including nested group shapes)
         segments = self._collect_segments(pres)
         if not segments:
             logger.info("No text segments found in PPTX, returning original document.")
-            return content_bytes
+            return pres_stream.getvalue()
 
         # 2) Call Azure OpenAI to translate
         id_to_translation = self.oai_client.translate_segments(
@@ -208,5 +222,5 @@ class PptxProcessor:
         # 4) Save to bytes
         out_stream = io.BytesIO()
         pres.save(out_stream)
-        out_stream.seek(0)
-        return out_stream.read()
+        # getvalue() hands back the buffer without a seek + read() copy
+        return out_stream.getvalue()
@@ -1,7 +1,12 @@
 import json
 import base64
 import io
-from typing import List, Dict, Optional
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Dict, Optional, Tuple
 from PIL import Image
 from openai import AzureOpenAI
 from ai_translation_config_loader import ConfigLoader
@@ -9,7 +14,104 @@ from ai_translation_logger import logger
 from ai_translation_utils import UtilityFunctions
 
 
+class BatchTranslateScheduler:
+    """
+    Coalesces translate_segments work submitted from concurrent documents
+    (or concurrent chunks of one document) into shared API requests.
+
+    A background thread waits for the first submission, then keeps draining
+    the queue for up to `max_wait` seconds or until `max_batch` segments are
+    queued. Submissions for the same (language, dialect) are merged into one
+    translate_segments call, run on a small pool, and each submitter's Future
+    gets back only its own {id: translation} dict. `max_batch` is also the
+    per-request batch size, so merging never makes an API request larger
+    than DocxTranslator.SEGMENT_CHUNK_SIZE.
+    """
+
+    def __init__(self, oai_client: "OaiClient", max_batch: int = 50, max_wait: float = 0.05, max_workers: int = 4):
+        self.oai_client = oai_client
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue: "queue.Queue[Tuple[List[Dict[str, str]], Optional[str], Optional[str], Future]]" = queue.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._worker = threading.Thread(target=self._run, name="batch-translate-scheduler", daemon=True)
+        self._worker.start()
+
+    def submit(
+        self,
+        segments: List[Dict[str, str]],
+        target_language: Optional[str] = None,
+        target_dialect: Optional[str] = None,
+    ) -> Future:
+        future: Future = Future()
+        self._queue.put((segments, target_language, target_dialect, future))
+        return future
+
+    def _run(self) -> None:
+        while True:
+            pending = [self._queue.get()]
+            queued = len(pending[0][0])
+            deadline = time.monotonic() + self.max_wait
+            while queued < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                pending.append(item)
+                queued += len(item[0])
+
+            groups: Dict[Tuple[Optional[str], Optional[str]], List] = {}
+            for item in pending:
+                groups.setdefault((item[1], item[2]), []).append(item)
+            for (lang, dialect), items in groups.items():
+                self._executor.submit(self._translate_group, items, lang, dialect)
+
+    def _translate_group(self, items: List, target_language: Optional[str], target_dialect: Optional[str]) -> None:
+        # Ids only need to be unique per document, so prefix them with the
+        # submission index while merged and strip the prefix on the way out.
+        merged = [
+            {"id": f"{n}:{seg['id']}", "text": seg["text"]}
+            for n, (segments, _, _, _) in enumerate(items)
+            for seg in segments
+        ]
+        if len(items) > 1:
+            logger.info(f"Merged {len(items)} submissions into one request of {len(merged)} segments.")
+        try:
+            result = self.oai_client.translate_segments(
+                merged,
+                target_language=target_language,
+                target_dialect=target_dialect,
+                batch_size=self.max_batch,
+            )
+
+            per_item: List[Dict[str, str]] = [{} for _ in items]
+            for merged_id, translation in result.items():
+                # Ignore anything the model invented that is not one of ours
+                n, sep, seg_id = str(merged_id).partition(":")
+                if sep and n.isdigit() and int(n) < len(per_item):
+                    per_item[int(n)][seg_id] = translation
+            for (_, _, _, future), translations in zip(items, per_item):
+                future.set_result(translations)
+        except Exception as e:
+            # Runs on an executor thread: an exception left here would be
+            # swallowed and the submitters would wait forever.
+            for _, _, _, future in items:
+                if not future.done():
+                    future.set_exception(e)
+
+
 class OaiClient:
+    # Max (text, language, dialect) entries kept in the process-level translation cache
+    TRANSLATION_CACHE_SIZE = 20000
+
+    # Images sent to the vision model are capped to this size on the longer
+    # side and sent as JPEG; the originals are left untouched for the redraw.
+    VISION_MAX_DIM = 1536
+    VISION_JPEG_QUALITY = 85
+
     def __init__(self):
         cfg = ConfigLoader.get_instance()
         utils = UtilityFunctions()
@@ -27,6 +129,46 @@ class OaiClient:
             azure_endpoint=self.openai_api_base,
         )
 
+        # (text, language, dialect) -> translation, shared by every document
+        # translated with this client so repeated boilerplate is sent only once.
+        self._translation_cache: Dict[Tuple[str, str, str], str] = {}
+        self._translation_cache_lock = threading.Lock()
+
+        self._scheduler: Optional[BatchTranslateScheduler] = None
+        self._scheduler_lock = threading.Lock()
+
+    def _get_cached_translation(self, text: str, lang: str, dialect: str) -> Optional[str]:
+        with self._translation_cache_lock:
+            return self._translation_cache.get((text, lang, dialect))
+
+    def _cache_translation(self, text: str, lang: str, dialect: str, translation: str) -> None:
+        with self._translation_cache_lock:
+            if len(self._translation_cache) >= self.TRANSLATION_CACHE_SIZE:
+                # Evict the oldest entry (dicts keep insertion order)
+                self._translation_cache.pop(next(iter(self._translation_cache)))
+            self._translation_cache[(text, lang, dialect)] = translation
+
+    def submit_segments(
+        self,
+        segments: List[Dict[str, str]],
+        target_language: Optional[str] = None,
+        target_dialect: Optional[str] = None,
+    ) -> Future:
+        """
+        Queue segments on the shared BatchTranslateScheduler (started on first
+        use) and return a Future for their {id: translation} dict. Segments
+        submitted around the same time by other documents or threads share
+        the same API requests.
+        """
+        if self._scheduler is None:
+            with self._scheduler_lock:
+                if self._scheduler is None:
+                    self._scheduler = BatchTranslateScheduler(
+                        self,
+                        max_workers=int(os.getenv("TEXT_TRANSLATION_CONCURRENCY", "4")),
+                    )
+        return self._scheduler.submit(segments, target_language, target_dialect)
+
     def _build_system_prompt(self, target_language: Optional[str] = None, target_dialect: Optional[str] = None) -> str:
         lang = target_language or self.target_language
         dialect = target_dialect or self.target_dialect
@@ -44,6 +186,8 @@ class OaiClient:
             "Do NOT add, remove, or reorder segments.\n"
             "Do NOT change placeholders like {name}, {date}, {url}, etc.\n"
             "Do NOT change numbers or URLs.\n"
+            "Some texts contain the \u241F separator between formatted pieces: keep exactly as many "
+            "\u241F separators as the original, each between the corresponding translated pieces.\n"
             "Output ONLY valid JSON, no extra commentary."
         )
 
@@ -65,8 +209,21 @@ class OaiClient:
         id_to_translation: Dict[str, str] = {}
 
         system_prompt = self._build_system_prompt(target_language, target_dialect)
+        lang = target_language or self.target_language or ""
+        dialect = target_dialect or self.target_dialect or ""
+
+        # Serve texts already translated earlier in this process from the cache
+        pending: List[Dict[str, str]] = []
+        for seg in segments:
+            cached = self._get_cached_translation(seg["text"], lang, dialect)
+            if cached is not None:
+                id_to_translation[seg["id"]] = cached
+            else:
+                pending.append(seg)
+        if len(pending) < len(segments):
+            logger.info(f"Reused {len(segments) - len(pending)} cached translations; {len(pending)} left to translate.")
 
-        for batch in utils.chunk_list(segments, batch_size):
+        for batch in utils.chunk_list(pending, batch_size):
             batch_ids = [s["id"] for s in batch]
             logger.info(f"Translating batch of {len(batch)} segments: {batch_ids[0]} ... {batch_ids[-1]}")
             payload = {"segments": batch}
@@ -104,6 +261,9 @@ class OaiClient:
                     if missing_ids:
                         raise ValueError(f"Model did not return translations for IDs: {missing_ids}")
 
+                    for seg in batch:
+                        self._cache_translation(seg["text"], lang, dialect, id_to_translation[seg["id"]])
+
                     break  # success, go to next batch
 
                 except Exception as e:
@@ -116,10 +276,13 @@ class OaiClient:
     
     def _prepare_image_for_vision(self, image_bytes: bytes) -> bytes:
         """
-        Normalize and upscale the image so GPT-4.1 can read small text better:
+        Normalize the image for GPT-4.1 vision:
         - Convert to RGB
         - If max dimension < 800 px, scale up to ~1024 px on the longer side
-        - Encode as PNG
+          so small text is readable
+        - If max dimension > VISION_MAX_DIM, scale down to VISION_MAX_DIM
+          (large PNG screenshots otherwise dominate upload time and tokens)
+        - Encode as JPEG
         """
         img = Image.open(io.BytesIO(image_bytes)).convert("RGB")
         w, h = img.size
@@ -132,11 +295,13 @@ class OaiClient:
             new_h = int(h * scale)
             img = img.resize((new_w, new_h), Image.LANCZOS)
             logger.info(f"Upscaled image from {w}x{h} to {new_w}x{new_h} for vision OCR.")
+        elif max_dim > self.VISION_MAX_DIM:
+            img.thumbnail((self.VISION_MAX_DIM, self.VISION_MAX_DIM), Image.LANCZOS)
+            logger.info(f"Downscaled image from {w}x{h} to {img.width}x{img.height} for vision OCR.")
 
         out = io.BytesIO()
-        img.save(out, format="PNG")
-        out.seek(0)
-        return out.read()
+        img.save(out, format="JPEG", quality=self.VISION_JPEG_QUALITY)
+        return out.getvalue()
 
     def translate_image_to_language(
         self,
@@ -178,7 +343,7 @@ class OaiClient:
         # Normalize & upscale
         norm_bytes = self._prepare_image_for_vision(image_bytes)
         b64 = base64.b64encode(norm_bytes).decode("utf-8")
-        image_url = {"url": f"data:image/png;base64,{b64}"}
+        image_url = {"url": f"data:image/jpeg;base64,{b64}"}
 
         logger.info("Calling GPT-4.1 vision to translate image text...")
         response = self.client.chat.completions.create(
@@ -204,3 +369,83 @@ class OaiClient:
         translated_text = response.choices[0].message.content.strip()
         logger.info(f"[image translation] GPT output (first 120 chars): {translated_text[:120]!r}")
         return translated_text
+
+    def translate_images_to_language(
+        self,
+        images: List[Dict],
+        target_language: Optional[str] = None,
+        target_dialect: Optional[str] = None,
+    ) -> Dict[str, str]:
+        """
+        Translate the text of several images with ONE vision request.
+
+        images:  [{"id": "img_1", "bytes": b"...", "content_type": "image/png"}, ...]
+        Returns: {"img_1": "translated text", ...}  (images without text map to "")
+        """
+        lang = target_language or self.target_language
+        dialect = target_dialect or self.target_dialect
+
+        dialect_clause = f" Use {lang} as used in {dialect}." if dialect else ""
+
+        system_message = f"""
+            You are a professional document translator.
+
+            You will be shown several IMAGES extracted from a Word document, each preceded
+            by its id. They may contain tables rendered as images, headings, labels,
+            or multiple pieces of text.
+
+            For EACH image:
+            1. Read ALL clearly visible text in the image.
+            2. Translate ALL of that text into {lang}.{dialect_clause}
+            3. Preserve the logical structure as plain text or simple Markdown:
+            - If it looks like a table, keep a table-like layout.
+            - If there are headings, keep them on separate lines.
+
+            Return a JSON object: {{"images": [{{"id": "<id>", "text": "<translated text>"}}, ...]}}
+            with exactly one entry per image and the same ids.
+            Use an empty string for images without readable text.
+            Do NOT include the original language.
+            Output ONLY valid JSON, no extra commentary.
+            """
+
+        content = [
+            {
+                "type": "text",
+                "text": f"Translate ALL readable text in each of these {len(images)} images into {lang}.",
+            }
+        ]
+        for image in images:
+            norm_bytes = self._prepare_image_for_vision(image["bytes"])
+            b64 = base64.b64encode(norm_bytes).decode("utf-8")
+            content.append({"type": "text", "text": f"Image id={image['id']}:"})
+            content.append({"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{b64}"}})
+
+        logger.info(f"Calling GPT-4.1 vision to translate text of {len(images)} images in one request...")
+        response = self.client.chat.completions.create(
+            model=self.deployment_id,
+            messages=[
+                {
+                    "role": "system",
+                    "content": system_message,
+                },
+                {
+                    "role": "user",
+                    "content": content,
+                },
+            ],
+            temperature=0.1,
+            max_tokens=min(1024 * len(images), 16384),
+            top_p=1,
+        )
+
+        parsed = UtilityFunctions.safe_json_loads(response.choices[0].message.content)
+        id_to_text: Dict[str, str] = {}
+        for item in parsed.get("images", []):
+            id_to_text[str(item["id"])] = (item.get("text") or "").strip()
+
+        missing_ids = {image["id"] for image in images} - set(id_to_text)
+        if missing_ids:
+            raise ValueError(f"Model did not return translations for image IDs: {missing_ids}")
+
+        logger.info(f"[image translation] Batched GPT output for {len(id_to_text)} images.")
+        return id_to_text
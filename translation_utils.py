@@ -1,16 +1,24 @@
 import json
 import os
+import re
+import zipfile
+from functools import lru_cache
 from io import BytesIO
-from typing import Iterable, List, Dict, Any
+from typing import Iterable, List, Dict, Any, Optional, Set
 
-import fitz  # PyMuPDF
-from docx import Document
-from pptx import Presentation
 from azure.storage.blob import BlobClient
 
+try:
+    import orjson  # optional: C-accelerated JSON parser
+except ImportError:
+    # Fall back to stdlib json in safe_json_loads
+    orjson = None
+
 from spanish_translator_logger import logger
 from spanish_translator_config_loader import ConfigLoader
 
+_PPTX_SLIDE_RE = re.compile(r"^ppt/slides/slide\d+\.xml$")
+
 
 class UtilityFunctions:
     def __init__(self):
@@ -20,6 +28,43 @@ class UtilityFunctions:
         self.output_container_client = getattr(cfg, "output_container_client", None)
         # If you later want to upload logs from here:
         self.logs_container_client = getattr(cfg, "logs_container_client", None)
+        # Snapshot of output blob names, so existence checks are a set lookup
+        # instead of one HEAD request per source file. Listed on the first
+        # translated_output_exists() call, not on every construction.
+        self._existing_outputs: Optional[Set[str]] = None
+        self._existing_outputs_listed = False
+
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def get_extension(filename: str) -> str:
+        """
+        Lower-cased extension of a blob name, including the dot ("" if none).
+        Matches os.path.splitext for ordinary blob names, without the path
+        normalization work; cached since the same names are dispatched repeatedly.
+        """
+        dot = filename.rfind(".")
+        if dot <= filename.rfind("/") + 1:
+            return ""
+        return filename[dot:].lower()
+
+    @staticmethod
+    def safe_json_loads(text: str) -> Any:
+        """
+        Parse JSON returned by the model, tolerating ```json fences around it.
+        Uses orjson when installed; its errors subclass json.JSONDecodeError.
+        """
+        cleaned = text.strip()
+        if cleaned.startswith("```"):
+            cleaned = cleaned.strip("`")
+            if cleaned.lower().startswith("json"):
+                cleaned = cleaned[4:]
+            cleaned = cleaned.strip()
+
+        try:
+            return orjson.loads(cleaned) if orjson is not None else json.loads(cleaned)
+        except json.JSONDecodeError as e:
+            logger.error(f"Failed to parse model JSON output: {e}")
+            raise
 
     def get_files_to_process(self) -> List[str]:
         """
@@ -31,6 +76,21 @@ class UtilityFunctions:
             blob_names.append(blob.name)
         return blob_names
 
+    def _list_existing_outputs(self) -> Optional[Set[str]]:
+        """
+        List all blob names in the output container once.
+        Returns None if the output container is not configured or cannot be listed,
+        in which case translated_output_exists falls back to per-blob checks.
+        """
+        if not self.output_container_client:
+            return None
+
+        try:
+            return set(self.output_container_client.list_blob_names())
+        except Exception as e:
+            logger.warning(f"Could not list output container; falling back to per-blob checks: {e}")
+            return None
+
     def get_translated_blob_name(self, src_blob_name: str, suffix: str = "_fr") -> str:
         """
         Given an input blob name, return the translated output blob name.
@@ -50,16 +110,23 @@ class UtilityFunctions:
             return False
 
         out_name = self.get_translated_blob_name(src_blob_name, suffix=suffix)
-        blob_client: BlobClient = self.output_container_client.get_blob_client(out_name)
 
-        try:
-            exists = blob_client.exists()
-        except Exception as e:
-            logger.warning(
-                f"Could not check existence of translated blob {out_name} "
-                f"for {src_blob_name}: {e}"
-            )
-            return False
+        if not self._existing_outputs_listed:
+            self._existing_outputs = self._list_existing_outputs()
+            self._existing_outputs_listed = True
+
+        if self._existing_outputs is not None:
+            exists = out_name in self._existing_outputs
+        else:
+            blob_client: BlobClient = self.output_container_client.get_blob_client(out_name)
+            try:
+                exists = blob_client.exists()
+            except Exception as e:
+                logger.warning(
+                    f"Could not check existence of translated blob {out_name} "
+                    f"for {src_blob_name}: {e}"
+                )
+                return False
 
         if exists:
             logger.info(
@@ -71,23 +138,26 @@ class UtilityFunctions:
         blob_client: BlobClient = self.input_container_client.get_blob_client(blob_name)
         file_data = blob_client.download_blob().readall()
 
-        _, ext = os.path.splitext(blob_name)
-        ext = ext.lower()
+        ext = self.get_extension(blob_name)
 
         if ext == ".pdf":
+            # Imported here so DOCX/PPTX-only runs never load PyMuPDF
+            import fitz  # PyMuPDF
+
             with fitz.open(stream=file_data, filetype="pdf") as doc:
                 return len(doc)
 
+        # DOCX/PPTX are plain zip archives; read the parts we need directly
+        # instead of building the full python-docx / python-pptx object model.
         elif ext == ".pptx":
-            prs = Presentation(BytesIO(file_data))
-            return len(prs.slides)
+            with zipfile.ZipFile(BytesIO(file_data)) as z:
+                return sum(1 for name in z.namelist() if _PPTX_SLIDE_RE.match(name))
 
         elif ext == ".docx":
-            document = Document(BytesIO(file_data))
-            para_count = len(document.paragraphs)
-            # crude heuristic: ~40 paragraphs per "page"
-            approx_pages = max(1, para_count // 40 or 1)
-            return approx_pages
+            with zipfile.ZipFile(BytesIO(file_data)) as z:
+                xml = z.read("word/document.xml")
+            # crude heuristic: explicit page breaks + 1
+            return xml.count(b'w:type="page"') + 1
 
         else:
             raise ValueError(f"Unsupported file type for page count: {ext}")
@@ -97,6 +167,21 @@ class UtilityFunctions:
         logger.info(f"Downloading blob: {blob_name}")
         return blob_client.download_blob().readall()
 
+    def download_blob_stream(self, blob_name: str, max_concurrency: int = 8) -> BytesIO:
+        """
+        Download a blob into a BytesIO that can be handed straight to
+        Document()/Presentation()/fitz.open(stream=...), without first
+        materializing a separate bytes copy via readall().
+        readinto() fetches ranges on up to max_concurrency connections and
+        writes them directly into the buffer.
+        """
+        blob_client: BlobClient = self.input_container_client.get_blob_client(blob_name)
+        logger.info(f"Downloading blob (streamed): {blob_name}")
+        buf = BytesIO()
+        blob_client.download_blob(max_concurrency=max_concurrency).readinto(buf)
+        buf.seek(0)
+        return buf
+
     def upload_log_to_blob(self, blob_name: str, log_data: str) -> None:
         if not self.logs_container_client:
             logger.warning("logs_container_client not configured; cannot upload log blob.")
@@ -1,10 +1,35 @@
 # translators/__init__.py
 
+import importlib
+from functools import lru_cache
+
 from ai_translation_oai_client import OaiClient
+from ai_translation_utils import UtilityFunctions
+
+# extension -> (module, class). Modules are imported on first use so that a
+# DOCX/PPTX-only run never pays for importing pdf2docx / PyMuPDF.
+_TRANSLATOR_REGISTRY = {
+    ".docx": ("translators.docx_translator", "DocxTranslator"),
+    ".pptx": ("translators.pptx_translator", "PptxTranslator"),
+    ".pdf": ("translators.pdf_translator", "PdfTranslator"),
+}
+
+
+@lru_cache(maxsize=None)
+def _load_translator_class(extension: str):
+    module_name, class_name = _TRANSLATOR_REGISTRY[extension]
+    return getattr(importlib.import_module(module_name), class_name)
+
 
-from .docx_translator import DocxTranslator
-from .pptx_translator import PptxTranslator
-from .pdf_translator import PdfTranslator
+def get_translator(filename: str, oai_client: OaiClient):
+    """
+    Return a translator instance for the file's extension, or None if unsupported.
+    Only the module for that extension is imported.
+    """
+    extension = UtilityFunctions.get_extension(filename)
+    if extension not in _TRANSLATOR_REGISTRY:
+        return None
+    return _load_translator_class(extension)(oai_client)
 
 
 def get_translators(oai_client: OaiClient):
@@ -14,9 +39,16 @@ def get_translators(oai_client: OaiClient):
     Each translator implements:
       - can_handle(filename: str) -> bool
       - translate_document(filename, content_bytes, target_language, target_dialect) -> bytes
+      - translate_document_to_stream(filename, content, out_fileobj, target_language, target_dialect)
+
+    Prefer get_translator(filename, ...) when only one file type is processed.
     """
-    return [
-        DocxTranslator(oai_client),
-        PptxTranslator(oai_client),
-        PdfTranslator(oai_client),
-    ]
+    return [_load_translator_class(ext)(oai_client) for ext in _TRANSLATOR_REGISTRY]
+
+
+def __getattr__(name: str):
+    # Keep `from translators import DocxTranslator` working without eager imports.
+    for module_name, class_name in _TRANSLATOR_REGISTRY.values():
+        if class_name == name:
+            return getattr(importlib.import_module(module_name), class_name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
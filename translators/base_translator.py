@@ -1,5 +1,9 @@
+import io
 from abc import ABC, abstractmethod
-from typing import Optional, Any
+from pathlib import Path
+from typing import BinaryIO, Dict, List, Optional, Any, Union
+
+from ai_translation_logger import logger
 
 
 class BaseTranslator(ABC):
@@ -15,6 +19,20 @@ class BaseTranslator(ABC):
         ...
 
     @abstractmethod
+    def translate_document_to_stream(
+        self,
+        filename: str,
+        content: Union[bytes, BinaryIO, str, Path],
+        out_fileobj: BinaryIO,
+        target_language: Optional[str] = None,
+        target_dialect: Optional[str] = None,
+    ) -> None:
+        """
+        Write the translated document into out_fileobj.
+        content may be bytes, an open binary file, or a path.
+        """
+        ...
+
     def translate_document(
         self,
         filename: str,
@@ -23,6 +41,85 @@ class BaseTranslator(ABC):
         target_dialect: Optional[str] = None,
     ) -> bytes:
         """
-        Return translated document bytes (same format as input).
+        Return translated document bytes.
         """
-        ...
+        return self._translate_to_bytes(filename, content_bytes, target_language, target_dialect)
+
+    def translate_document_stream(
+        self,
+        filename: str,
+        content_stream: Union[BinaryIO, str, Path],
+        target_language: Optional[str] = None,
+        target_dialect: Optional[str] = None,
+    ) -> bytes:
+        """
+        Same as translate_document, but takes an open binary file or a path
+        instead of bytes.
+        """
+        return self._translate_to_bytes(filename, content_stream, target_language, target_dialect)
+
+    def _translate_to_bytes(
+        self,
+        filename: str,
+        content: Union[bytes, BinaryIO, str, Path],
+        target_language: Optional[str],
+        target_dialect: Optional[str],
+    ) -> bytes:
+        out_stream = io.BytesIO()
+        self.translate_document_to_stream(
+            filename,
+            content,
+            out_stream,
+            target_language=target_language,
+            target_dialect=target_dialect,
+        )
+        # getvalue() hands back the buffer without a seek + read() copy
+        return out_stream.getvalue()
+
+    def _translate_unique_segments(
+        self,
+        segments: List[Dict[str, str]],
+        target_language: Optional[str] = None,
+        target_dialect: Optional[str] = None,
+    ) -> Dict[str, str]:
+        """
+        Send each distinct segment text to the model once (labels, repeated
+        headers, titles and footers), then fan the translation back out to
+        every segment id that had that text.
+        """
+        unique: Dict[str, str] = {}  # text -> id of its first segment
+        for seg in segments:
+            unique.setdefault(seg["text"], seg["id"])
+
+        unique_segments = [{"id": seg_id, "text": text} for text, seg_id in unique.items()]
+        logger.info(
+            f"[{type(self).__name__}] Translating {len(unique_segments)} unique texts "
+            f"for {len(segments)} segments."
+        )
+
+        unique_result = self._translate_segments(
+            unique_segments,
+            target_language=target_language,
+            target_dialect=target_dialect,
+        )
+        return {
+            seg["id"]: unique_result[unique[seg["text"]]]
+            for seg in segments
+            if unique[seg["text"]] in unique_result
+        }
+
+    def _translate_segments(
+        self,
+        segments: List[Dict[str, str]],
+        target_language: Optional[str] = None,
+        target_dialect: Optional[str] = None,
+    ) -> Dict[str, str]:
+        """
+        Translate segments -> {id: translation}. Override to change how they
+        reach the model (e.g. chunked through the client's batch scheduler).
+        """
+        return self.oai_client.translate_segments(
+            segments,
+            target_language=target_language,
+            target_dialect=target_dialect,
+        )
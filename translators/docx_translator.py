@@ -1,20 +1,65 @@
 # translators/docx_translator.py
 
+import hashlib
 import io
+import os
 import textwrap
-from typing import List, Dict, Optional
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
+from pathlib import Path
+from typing import BinaryIO, List, Dict, Optional, Tuple, Union
 
 from docx import Document  # python-docx
-from docx.opc.constants import RELATIONSHIP_TYPE as RT
+from docx.oxml.ns import qn
+from docx.oxml.xmlchemy import BaseOxmlElement
+from lxml import etree
 
 from PIL import Image, ImageDraw, ImageFont
 
+from .base_translator import BaseTranslator
 from ai_translation_logger import logger
-from ai_translation_utils import UtilityFunctions
-from ai_translation_oai_client import OaiClient
 
+# Clark-notation tags resolved once, instead of a qn() ns-map lookup per run.
+_R_TAG = qn("w:r")
+_T_TAG = qn("w:t")
+_RPR_TAG = qn("w:rPr")
 
-class DocxTranslator:
+
+@lru_cache(maxsize=1)
+def _default_font_and_line_height():
+    """
+    Load PIL's default font once per process and derive a safe line height
+    from its metrics, instead of reloading it for every redrawn image.
+    """
+    try:
+        font = ImageFont.load_default()
+    except Exception:
+        return None, 16
+
+    try:
+        ascent, descent = font.getmetrics()
+        return font, ascent + descent + 4
+    except Exception:
+        return font, 16
+
+
+@lru_cache(maxsize=1)
+def _text_detector():
+    """
+    easyocr reader used by the optional OCR prefilter (CPU only), loaded once.
+    Returns None if easyocr is not installed.
+    """
+    try:
+        import easyocr
+    except ImportError:
+        logger.warning("VISION_OCR_PREFILTER=1 but easyocr is not installed; prefilter disabled.")
+        return None
+    return easyocr.Reader(["en"], gpu=False, verbose=False)
+
+
+class DocxTranslator(BaseTranslator):
     """
     DOCX translator.
 
@@ -26,74 +71,138 @@ class DocxTranslator:
             - GPT reads & translates any text in the image
             - We render the translated text into a new image (same size, white background)
             - Replace the image in the DOCX with this translated version.
+        * With IMAGE_TRANSLATION_MODE=alt_text the image is kept as-is and the
+          translated text is written to its alt text (<wp:docPr descr=...>)
+          instead, which skips the PIL redraw entirely.
     """
 
-    def __init__(self, oai_client: OaiClient):
-        self.oai_client = oai_client
+    # Max images sent to the vision model in one request (1 = one request per image)
+    IMAGE_BATCH_SIZE = int(os.getenv("VISION_BATCH_SIZE", "20"))
+    # Max vision requests in flight at once
+    VISION_CONCURRENCY = int(os.getenv("VISION_CONCURRENCY", "8"))
+
+    # Images smaller than this on both sides (icons, bullets) are never sent to vision
+    MIN_TEXT_IMAGE_PX = 64
+    # Opt-in local OCR text detection (easyocr) before calling the vision model
+    OCR_PREFILTER = os.getenv("VISION_OCR_PREFILTER") == "1"
+    # "redraw" (replace the image with rendered translated text) or "alt_text"
+    IMAGE_TRANSLATION_MODE = os.getenv("IMAGE_TRANSLATION_MODE", "redraw")
+
+    # Text segments per submission to the client's batch scheduler
+    SEGMENT_CHUNK_SIZE = 50
+    # Seconds to wait for all text translations of one document
+    TEXT_TRANSLATION_TIMEOUT = float(os.getenv("TEXT_TRANSLATION_TIMEOUT", "600"))
+
+    # (image size, translated text, content type) -> rendered bytes, shared by
+    # all instances so identical images across documents are drawn once.
+    _RENDER_CACHE: "OrderedDict[Tuple[Tuple[int, int], str, str], bytes]" = OrderedDict()
+    RENDER_CACHE_SIZE = 64
+
+    # (original image hash, target language, target dialect) -> replacement
+    # bytes, so a logo/letterhead repeated across a batch of documents costs
+    # one vision call and one redraw.
+    _IMAGE_TRANS_CACHE: "OrderedDict[Tuple[str, str, str], bytes]" = OrderedDict()
+    IMAGE_TRANS_CACHE_SIZE = 256
+
+    # Guards both class-level caches, which documents translated on other
+    # threads read and update concurrently.
+    _CACHE_LOCK = threading.Lock()
 
     def can_handle(self, filename: str) -> bool:
-        return UtilityFunctions.get_extension(filename) == ".docx"
+        return filename.lower().endswith(".docx")
 
     # ---------------------------------------------------------
     # TEXT: collect RUN-level segments
     # ---------------------------------------------------------
-    def _collect_segments(self, doc: Document) -> List[Dict[str, str]]:
+    def _group_runs(self, doc: Document) -> List[List[BaseOxmlElement]]:
+        """
+        Single lxml pass over every <w:r> with text in the document body
+        (paragraphs, table cells at any depth, hyperlinks, text boxes).
+
+        Adjacent runs under the same parent with identical <w:rPr> are grouped:
+        Word often splits one sentence into many runs (spell-check marks,
+        revisions), and translating the fragments separately costs more tokens
+        and hurts quality. Any run without text (images, field chars) breaks a group.
+        """
+        groups: List[List[BaseOxmlElement]] = []
+        prev_r = None
+        prev_key = None
+
+        for r in doc.element.body.iter(_R_TAG):
+            if r.find(_T_TAG) is None:
+                prev_r = None
+                continue
+
+            rPr = r.find(_RPR_TAG)
+            key = etree.tostring(rPr) if rPr is not None else b""
+            if prev_r is not None and key == prev_key and r.getparent() is prev_r.getparent():
+                groups[-1].append(r)
+            else:
+                groups.append([r])
+            prev_r, prev_key = r, key
+
+        return groups
+
+    def _collect_segments(
+        self, doc: Document
+    ) -> Tuple[List[Dict[str, str]], List[Tuple[str, List[BaseOxmlElement]]]]:
+        """
+        One segment per group of same-format runs (see _group_runs).
+
+        Returns the segments for the API and a parallel (seg_id, [<w:r>, ...])
+        run index, so applying translations never has to walk the document
+        again. Nothing is kept on self: one instance may translate several
+        documents at once.
+        """
         segments: List[Dict[str, str]] = []
+        run_index: List[Tuple[str, List[BaseOxmlElement]]] = []
+
+        for group in self._group_runs(doc):
+            # CT_R.text maps <w:tab/>, <w:br/> etc. to their text equivalents,
+            # same as Run.text
+            text = "".join(r.text for r in group)
+            if text and not text.isspace():
+                seg_id = f"r{len(segments)}"
+                segments.append({"id": seg_id, "text": text})
+                run_index.append((seg_id, group))
 
-        # Top-level paragraphs
-        for p_idx, para in enumerate(doc.paragraphs):
-            for r_idx, run in enumerate(para.runs):
-                text = run.text
-                if text and text.strip():
-                    seg_id = f"p-{p_idx}-r-{r_idx}"
-                    segments.append({"id": seg_id, "text": text})
-
-        # Tables (cells)
-        for t_idx, table in enumerate(doc.tables):
-            for row_idx, row in enumerate(table.rows):
-                for col_idx, cell in enumerate(row.cells):
-                    for p_idx, para in enumerate(cell.paragraphs):
-                        for r_idx, run in enumerate(para.runs):
-                            text = run.text
-                            if text and text.strip():
-                                seg_id = (
-                                    f"tbl-{t_idx}-row-{row_idx}-col-{col_idx}-"
-                                    f"p-{p_idx}-r-{r_idx}"
-                                )
-                                segments.append({"id": seg_id, "text": text})
-
-        return segments
+        return segments, run_index
 
     def _apply_text_translations(
         self,
-        doc: Document,
+        run_index: List[Tuple[str, List[BaseOxmlElement]]],
         id_to_translation: Dict[str, str],
     ) -> None:
-        # Top-level paragraphs
-        for p_idx, para in enumerate(doc.paragraphs):
-            for r_idx, run in enumerate(para.runs):
-                text = run.text
-                if not text or not text.strip():
-                    continue
-                seg_id = f"p-{p_idx}-r-{r_idx}"
-                if seg_id in id_to_translation:
-                    run.text = id_to_translation[seg_id]
-
-        # Tables
-        for t_idx, table in enumerate(doc.tables):
-            for row_idx, row in enumerate(table.rows):
-                for col_idx, cell in enumerate(row.cells):
-                    for p_idx, para in enumerate(cell.paragraphs):
-                        for r_idx, run in enumerate(para.runs):
-                            text = run.text
-                            if not text or not text.strip():
-                                continue
-                            seg_id = (
-                                f"tbl-{t_idx}-row-{row_idx}-col-{col_idx}-"
-                                f"p-{p_idx}-r-{r_idx}"
-                            )
-                            if seg_id in id_to_translation:
-                                run.text = id_to_translation[seg_id]
+        # Reuse the run groups captured by _collect_segments: the translation
+        # goes into the first run (keeping its formatting), the rest are emptied.
+        for seg_id, group in run_index:
+            if seg_id in id_to_translation:
+                group[0].text = id_to_translation[seg_id]
+                for r in group[1:]:
+                    r.text = ""
+
+    def _translate_segments(
+        self,
+        segments: List[Dict[str, str]],
+        target_language: Optional[str] = None,
+        target_dialect: Optional[str] = None,
+    ) -> Dict[str, str]:
+        # Bounded-size chunks go through the client's batch scheduler, which
+        # merges them with chunks from other documents being translated at the
+        # same time and keeps several requests in flight.
+        futures = [
+            self.oai_client.submit_segments(
+                segments[start:start + self.SEGMENT_CHUNK_SIZE],
+                target_language=target_language,
+                target_dialect=target_dialect,
+            )
+            for start in range(0, len(segments), self.SEGMENT_CHUNK_SIZE)
+        ]
+        id_to_translation: Dict[str, str] = {}
+        # Bounded wait: a lost request fails this document instead of hanging the run
+        for future in as_completed(futures, timeout=self.TEXT_TRANSLATION_TIMEOUT):
+            id_to_translation.update(future.result())
+        return id_to_translation
 
     # ---------------------------------------------------------
     # IMAGES: markdown-table parser + GPT-4.1 vision + redraw
@@ -153,41 +262,86 @@ class DocxTranslator:
 
         return title_lines, cleaned_rows
 
+    def _wrap_to_width(self, paragraph: str, font, max_width_px: int) -> List[str]:
+        """
+        Greedy word-wrap measured in pixels with the font's own metrics,
+        so lines fill the image width instead of a fixed character count.
+        A word wider than the line (CJK text, long URLs) is broken between
+        characters, like textwrap's break_long_words.
+        """
+        if font is None or not hasattr(font, "getlength"):
+            return textwrap.wrap(paragraph, width=60)
+
+        # Measure the plain line first; most short lines need no wrapping
+        if font.getlength(paragraph) <= max_width_px:
+            return [paragraph]
+
+        lines: List[str] = []
+        current = ""
+        for word in paragraph.split():
+            candidate = f"{current} {word}" if current else word
+            if font.getlength(candidate) <= max_width_px:
+                current = candidate
+                continue
+            if current:
+                lines.append(current)
+            if font.getlength(word) <= max_width_px:
+                current = word
+                continue
+            # Too wide on its own: fill lines character by character
+            current = ""
+            for char in word:
+                if current and font.getlength(current + char) > max_width_px:
+                    lines.append(current)
+                    current = char
+                else:
+                    current += char
+        if current:
+            lines.append(current)
+        return lines
+
     def _render_translated_image(
         self,
-        original_bytes: bytes,
+        size: Tuple[int, int],
+        translated_text: str,
+        content_type: str,
+    ) -> bytes:
+        """
+        Cached front for _draw_translated_image. The output depends only on
+        the image size, the text and the format, so that is the cache key.
+        """
+        key = (size, translated_text, content_type)
+        cache = self._RENDER_CACHE
+        with self._CACHE_LOCK:
+            cached = cache.get(key)
+            if cached is not None:
+                cache.move_to_end(key)
+                return cached
+
+        # Drawn outside the lock; at worst two threads draw the same image once each
+        new_bytes = self._draw_translated_image(size, translated_text, content_type)
+        with self._CACHE_LOCK:
+            cache[key] = new_bytes
+            if len(cache) > self.RENDER_CACHE_SIZE:
+                cache.popitem(last=False)
+        return new_bytes
+
+    def _draw_translated_image(
+        self,
+        size: Tuple[int, int],
         translated_text: str,
         content_type: str,
     ) -> bytes:
         """
-        Create a new image same size as original, white background, and:
+        Create a new image of the original's size, white background, and:
         - If GPT returned a Markdown-like table, draw a table (title + grid)
         - Otherwise, draw wrapped text
         """
-        try:
-            orig_img = Image.open(io.BytesIO(original_bytes)).convert("RGB")
-        except Exception as e:
-            logger.error(f"Failed to open original image for redraw: {e}")
-            return original_bytes
-
-        width, height = orig_img.size
+        width, height = size
         new_img = Image.new("RGB", (width, height), "white")
         draw = ImageDraw.Draw(new_img)
 
-        try:
-            font = ImageFont.load_default()
-        except Exception:
-            font = None
-
-        # Safe line height
-        if font is not None:
-            try:
-                ascent, descent = font.getmetrics()
-                line_height = ascent + descent + 4
-            except Exception:
-                line_height = 16
-        else:
-            line_height = 16
+        font, line_height = _default_font_and_line_height()
 
         margin = 20
 
@@ -261,7 +415,9 @@ class DocxTranslator:
                 if not paragraph.strip():
                     wrapped_lines.append("")
                     continue
-                wrapped_lines.extend(textwrap.wrap(paragraph, width=60))
+                wrapped_lines.extend(
+                    self._wrap_to_width(paragraph, font, width - 2 * margin)
+                )
 
             y = margin
             for line in wrapped_lines:
@@ -278,85 +434,249 @@ class DocxTranslator:
         out.seek(0)
         return out.read()
 
+    def _image_size(self, image_bytes: bytes) -> Optional[Tuple[int, int]]:
+        """
+        (width, height) from the image header, without decoding the pixels.
+        None if PIL cannot open the image.
+        """
+        try:
+            with Image.open(io.BytesIO(image_bytes)) as im:
+                return im.size
+        except Exception:
+            return None
+
+    def _image_may_have_text(self, image_bytes: bytes, size: Tuple[int, int]) -> bool:
+        """
+        Cheap local gate in front of the vision model: tiny images are
+        decorative, and with VISION_OCR_PREFILTER=1 images where a local
+        text detector finds nothing are skipped too. When in doubt, returns True.
+        """
+        width, height = size
+        if width < self.MIN_TEXT_IMAGE_PX and height < self.MIN_TEXT_IMAGE_PX:
+            return False
+
+        if not self.OCR_PREFILTER:
+            return True
+
+        detector = _text_detector()
+        if detector is None:
+            return True
+        try:
+            horizontal_list, free_list = detector.detect(image_bytes)
+            return bool(horizontal_list[0] or free_list[0])
+        except Exception as e:
+            logger.warning(f"[image] OCR prefilter failed; sending image to vision anyway: {e}")
+            return True
+
+    def _translate_image_batch(
+        self,
+        batch: List[Dict],
+        target_language: Optional[str] = None,
+        target_dialect: Optional[str] = None,
+    ) -> Dict[str, str]:
+        """
+        Translate one batch of images with a single vision request.
+        If the batched call fails (e.g. malformed JSON), fall back to one
+        request per image so a single bad response doesn't drop the batch.
+        Runs on a worker thread: must not touch the python-docx document.
+        """
+        if len(batch) > 1:
+            try:
+                return self.oai_client.translate_images_to_language(
+                    batch,
+                    target_language=target_language,
+                    target_dialect=target_dialect,
+                )
+            except Exception as e:
+                logger.error(f"Batched GPT-4.1 vision failed for {len(batch)} images; retrying one by one: {e}")
+
+        id_to_text: Dict[str, str] = {}
+        for image in batch:
+            try:
+                id_to_text[image["id"]] = self.oai_client.translate_image_to_language(
+                    image["bytes"],
+                    content_type=image["content_type"],
+                    target_language=target_language,
+                    target_dialect=target_dialect,
+                )
+            except Exception as e:
+                logger.error(f"GPT-4.1 vision failed for image (part={image['id']}): {e}")
+        return id_to_text
+
+    def _alt_text_targets(self, doc: Document) -> Dict[str, List[BaseOxmlElement]]:
+        """
+        Map image partname -> <wp:docPr> elements of the drawings showing it,
+        across the body, headers and footers.
+        """
+        targets: Dict[str, List[BaseOxmlElement]] = {}
+        for part in doc.part.package.iter_parts():
+            element = getattr(part, "element", None)  # XML parts only
+            if element is None:
+                continue
+            for drawing in element.xpath(".//wp:inline | .//wp:anchor"):
+                for r_id in drawing.xpath(".//a:blip/@r:embed"):
+                    related = part.related_parts.get(r_id)
+                    if related is not None:
+                        targets.setdefault(str(related.partname), []).extend(drawing.xpath("./wp:docPr"))
+        return targets
+
     def _translate_images_in_doc(
         self,
         doc: Document,
         target_language: Optional[str] = None,
         target_dialect: Optional[str] = None,
     ) -> None:
-        image_count = 0
         translated_count = 0
 
-        for rel_id, rel in doc.part.rels.items():
-            if rel.reltype != RT.IMAGE:
+        # Index image parts once straight from the package instead of walking
+        # the relationship dict; each shared image part is visited only once.
+        # Only parts under /word/ (skips e.g. the docProps thumbnail).
+        image_parts = {
+            str(part.partname): part
+            for part in doc.part.package.iter_parts()
+            if part.content_type.startswith("image/") and part.partname.startswith("/word/")
+        }
+
+        alt_text_mode = self.IMAGE_TRANSLATION_MODE == "alt_text"
+        alt_text_targets = self._alt_text_targets(doc) if alt_text_mode else {}
+
+        image_cache = self._IMAGE_TRANS_CACHE
+        pending: List[Dict] = []
+        for partname, image_part in image_parts.items():
+            logger.info(f"[image] Found image part={partname}, content_type={image_part.content_type}")
+
+            cache_key = (
+                hashlib.blake2b(image_part.blob, digest_size=16).hexdigest(),
+                target_language or "",
+                target_dialect or "",
+            )
+            cached = None
+            if not alt_text_mode:
+                with self._CACHE_LOCK:
+                    cached = image_cache.get(cache_key)
+                    if cached is not None:
+                        image_cache.move_to_end(cache_key)
+            if cached is not None:
+                image_part._blob = cached
+                translated_count += 1
+                logger.info(f"[image] Reused cached translated image for part={partname}.")
                 continue
 
-            image_count += 1
-            image_part = rel.target_part
-            original_bytes = image_part.blob
-            content_type = getattr(image_part, "content_type", "image/png")
-
-            logger.info(f"[image] Found image rel_id={rel_id}, content_type={content_type}")
+            # Read the size once here; the redraw only needs the dimensions,
+            # so the original is never decoded/converted a second time.
+            size = self._image_size(image_part.blob)
+            if size is None:
+                logger.error(f"Failed to open image part={partname}; leaving it unchanged.")
+                continue
+            if not self._image_may_have_text(image_part.blob, size):
+                logger.info(f"[image] No text detected in part={partname}; skipping vision call.")
+                continue
+            pending.append(
+                {
+                    "id": partname,
+                    "bytes": image_part.blob,
+                    "content_type": image_part.content_type,
+                    "size": size,
+                    "cache_key": cache_key,
+                }
+            )
 
-            try:
-                translated_text = self.oai_client.translate_image_to_language(
-                    original_bytes,
-                    content_type=content_type,
-                    target_language=target_language,
-                    target_dialect=target_dialect,
-                )
-            except Exception as e:
-                logger.error(f"GPT-4.1 vision failed for image (rel_id={rel_id}): {e}")
+        # 1) Vision calls: one request per batch of images, batches in flight
+        #    concurrently (the calls are purely network-bound)
+        id_to_text: Dict[str, str] = {}
+        batches = [
+            pending[start:start + self.IMAGE_BATCH_SIZE]
+            for start in range(0, len(pending), self.IMAGE_BATCH_SIZE)
+        ]
+        if batches:
+            with ThreadPoolExecutor(max_workers=min(self.VISION_CONCURRENCY, len(batches))) as executor:
+                futures = [
+                    executor.submit(self._translate_image_batch, batch, target_language, target_dialect)
+                    for batch in batches
+                ]
+                for future in as_completed(futures):
+                    id_to_text.update(future.result())
+
+        # 2) Redraw + replace (or set alt text), serially: the docx object
+        #    model is not thread-safe
+        for image in pending:
+            partname = image["id"]
+            translated_text = id_to_text.get(partname)
+            if translated_text is None:
+                # Vision call failed; already logged
                 continue
 
             if not translated_text.strip():
-                logger.info(f"[image] No translated text returned for rel_id={rel_id}; leaving image unchanged.")
+                logger.info(f"[image] No translated text returned for part={partname}; leaving image unchanged.")
                 continue
 
             logger.info(
-                f"[image] GPT translation for rel_id={rel_id} (first 80 chars): "
+                f"[image] GPT translation for part={partname} (first 80 chars): "
                 f"{translated_text[:80]!r}"
             )
 
+            if alt_text_mode:
+                for doc_pr in alt_text_targets.get(partname, []):
+                    doc_pr.set("descr", translated_text)
+                translated_count += 1
+                logger.info(f"[image] Set translated alt text for part={partname}.")
+                continue
+
             try:
                 new_bytes = self._render_translated_image(
-                    original_bytes,
+                    image["size"],
                     translated_text,
-                    content_type,
+                    image["content_type"],
                 )
                 # Use private _blob because .blob is read-only in your python-docx version
-                image_part._blob = new_bytes
+                image_parts[partname]._blob = new_bytes
                 translated_count += 1
-                logger.info(f"[image] Replaced image (rel_id={rel_id}) with translated version.")
+
+                with self._CACHE_LOCK:
+                    image_cache[image["cache_key"]] = new_bytes
+                    if len(image_cache) > self.IMAGE_TRANS_CACHE_SIZE:
+                        image_cache.popitem(last=False)
+                logger.info(f"[image] Replaced image (part={partname}) with translated version.")
             except Exception as e:
-                logger.error(f"Failed to render/replace translated image (rel_id={rel_id}): {e}")
+                logger.error(f"Failed to render/replace translated image (part={partname}): {e}")
                 continue
 
-        logger.info(f"[image] Completed image translation. Found={image_count}, translated={translated_count}")
+        logger.info(f"[image] Completed image translation. Found={len(image_parts)}, translated={translated_count}")
 
     # ---------------------------------------------------------
     # Public entrypoint
     # ---------------------------------------------------------
-    def translate_document(
+    def translate_document_to_stream(
         self,
         filename: str,
-        content_bytes: bytes,
+        content: Union[bytes, BinaryIO, str, Path],
+        out_fileobj: BinaryIO,
         target_language: Optional[str] = None,
         target_dialect: Optional[str] = None,
-    ) -> bytes:
+    ) -> None:
+        """
+        Same as translate_document, but saves the translated DOCX straight
+        into out_fileobj (e.g. an open file or upload stream).
+        content may be bytes, an open binary file, or a path; python-docx
+        reads files and paths directly, without an in-memory copy.
+        """
         logger.info(f"Translating DOCX document (text + images): {filename}")
-        doc_stream = io.BytesIO(content_bytes)
-        doc = Document(doc_stream)
+        if isinstance(content, (bytes, bytearray)):
+            # BytesIO over a bytes object shares its buffer until written to
+            content = io.BytesIO(content)
+        elif isinstance(content, Path):
+            content = str(content)
+        doc = Document(content)
 
         # 1) Text (runs)
-        segments = self._collect_segments(doc)
+        segments, run_index = self._collect_segments(doc)
         if segments:
-            id_to_translation = self.oai_client.translate_segments(
+            id_to_translation = self._translate_unique_segments(
                 segments,
                 target_language=target_language,
                 target_dialect=target_dialect,
             )
-            self._apply_text_translations(doc, id_to_translation)
+            self._apply_text_translations(run_index, id_to_translation)
         else:
             logger.info("No text segments found in DOCX body text.")
 
@@ -371,7 +691,4 @@ class DocxTranslator:
             logger.error(f"Image translation step failed (non-fatal): {e}")
 
         # 3) Save final DOCX
-        out_stream = io.BytesIO()
-        doc.save(out_stream)
-        out_stream.seek(0)
-        return out_stream.read()
+        doc.save(out_fileobj)
@@ -1,10 +1,15 @@
 # translators/pdf_translator.py
 
+import hashlib
 import io
+import os
 import tempfile
+import threading
+import zipfile
 from pathlib import Path
-from typing import Optional
+from typing import BinaryIO, Optional, Union
 
+import fitz  # PyMuPDF (pdf2docx backend)
 from pdf2docx import Converter
 
 from .base_translator import BaseTranslator
@@ -21,65 +26,166 @@ class PdfTranslator(BaseTranslator):
       1) Convert the input PDF bytes to DOCX using pdf2docx.
       2) Run the resulting DOCX through the existing DocxTranslator
          (run-level translation, GPT-4.1 vision for images).
-      3) Return the translated DOCX bytes.
+      3) Write the translated DOCX.
 
     Notes:
       - Output is a DOCX document, not a PDF.
       - This leverages your already-tested DOCX pipeline for consistent behavior.
     """
 
+    # Converted DOCX files kept on disk, keyed by a hash of the source PDF.
+    # Least recently used entries are evicted (hits refresh the mtime).
+    CACHE_DIR = Path(tempfile.gettempdir()) / "pdf2docx_cache"
+    CACHE_MAX_ENTRIES = 20
+
+    # Opt-in (PDF_MULTI_PROCESSING=1): PDFs with at least PARALLEL_MIN_PAGES
+    # pages are parsed with pdf2docx's multi_processing mode. It forks while
+    # the translation threads are running, and its Pool() starts one process
+    # per CPU, so it is off by default.
+    MULTI_PROCESSING = os.getenv("PDF_MULTI_PROCESSING") == "1"
+    PARALLEL_MIN_PAGES = 4
+
+    # pdf2docx writes its per-shard pages-<i>.json files to relative paths,
+    # i.e. into the process working directory, so only one multi-process
+    # conversion may run at a time.
+    _MULTI_PROCESS_LOCK = threading.Lock()
+
     def can_handle(self, filename: str) -> bool:
-        return UtilityFunctions.get_extension(filename) == ".pdf"
+        return filename.lower().endswith(".pdf")
 
-    def _pdf_bytes_to_docx_bytes(self, pdf_bytes: bytes) -> bytes:
+    def _cache_path(self, pdf_bytes: bytes) -> Path:
+        key = hashlib.blake2b(pdf_bytes, digest_size=16).hexdigest()
+        return self.CACHE_DIR / f"{key}.docx"
+
+    def _use_cached(self, cache_path: Path) -> bool:
+        """
+        True if cache_path holds a readable DOCX; refreshes its mtime so
+        eviction is least-recently-used. A damaged entry is deleted so the
+        PDF gets converted again instead of failing on every run.
+        """
+        if not cache_path.is_file():
+            return False
+        try:
+            with zipfile.ZipFile(cache_path) as z:
+                z.getinfo("word/document.xml")
+            os.utime(cache_path)
+            return True
+        except (OSError, KeyError, zipfile.BadZipFile) as e:
+            logger.warning(f"[PDF] Discarding unreadable cached conversion {cache_path.name}: {e}")
+            cache_path.unlink(missing_ok=True)
+            return False
+
+    def _store_in_cache(self, docx_stream: io.BytesIO, cache_path: Path) -> None:
         """
-        Convert PDF bytes -> DOCX bytes via a temporary folder using pdf2docx.
+        Write a freshly converted DOCX into the cache and evict the least
+        recently used entries (by mtime) beyond CACHE_MAX_ENTRIES.
+        Cache failures are non-fatal.
         """
-        with tempfile.TemporaryDirectory() as tmpdir:
-            tmpdir_path = Path(tmpdir)
-            pdf_path = tmpdir_path / "input.pdf"
-            docx_path = tmpdir_path / "converted.docx"
+        try:
+            self.CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            # Write to a temp file and rename it into place, so a crash or a
+            # concurrent reader never sees a partially written entry.
+            fd, tmp_name = tempfile.mkstemp(dir=self.CACHE_DIR, suffix=".tmp")
+            try:
+                # getbuffer() writes the stream's memory without a bytes copy
+                with os.fdopen(fd, "wb") as tmp_file, docx_stream.getbuffer() as view:
+                    tmp_file.write(view)
+                os.replace(tmp_name, cache_path)
+            except BaseException:
+                Path(tmp_name).unlink(missing_ok=True)
+                raise
 
-            # Write PDF to temp file
-            with open(pdf_path, "wb") as f_pdf:
-                f_pdf.write(pdf_bytes)
+            entries = sorted(self.CACHE_DIR.glob("*.docx"), key=lambda p: p.stat().st_mtime)
+            for old in entries[:-self.CACHE_MAX_ENTRIES]:
+                old.unlink(missing_ok=True)
+        except OSError as e:
+            logger.warning(f"[PDF] Could not update pdf2docx cache: {e}")
 
-            logger.info(f"[PDF] Converting PDF to DOCX using pdf2docx: {pdf_path}")
-            try:
+    def _convert_multi_process(self, pdf_bytes: bytes, docx_stream: io.BytesIO, shards: int) -> None:
+        """
+        Parse pages with pdf2docx's own multi_processing mode, split into
+        `shards` page ranges. pdf2docx runs them on an unsized Pool(), i.e.
+        one process per CPU, and exchanges page data through pages-<i>.json
+        files in the working directory (left behind if a worker crashes).
+        Its workers re-open the PDF by path, so the PDF is written to a temp
+        dir (RAM-backed /dev/shm when available).
+        """
+        shm_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
+        with tempfile.TemporaryDirectory(dir=shm_dir) as tmpdir:
+            pdf_path = Path(tmpdir) / "input.pdf"
+            pdf_path.write_bytes(pdf_bytes)
+
+            with self._MULTI_PROCESS_LOCK:
+                logger.info(f"[PDF] Converting PDF to DOCX using pdf2docx in {shards} page shards: {pdf_path}")
                 cv = Converter(str(pdf_path))
-                # start=0, end=None -> all pages
-                cv.convert(str(docx_path), start=0, end=None)
+                cv.convert(docx_stream, start=0, end=None, multi_processing=True, cpu_count=shards)
                 cv.close()
-            except Exception as e:
-                logger.error(f"[PDF] pdf2docx conversion failed: {e}")
-                # If conversion fails, just return original PDF bytes
-                # Caller can handle this gracefully.
-                raise
 
-            # Read DOCX bytes
-            with open(docx_path, "rb") as f_docx:
-                docx_bytes = f_docx.read()
+    def _pdf_bytes_to_docx(self, pdf_bytes: bytes) -> Union[Path, io.BytesIO]:
+        """
+        Convert PDF bytes -> DOCX in memory using pdf2docx
+        (Converter(stream=...) in, BytesIO out; no temp files).
+        With PDF_MULTI_PROCESSING=1, larger PDFs are parsed with several processes.
+        Re-submitted PDFs (same content hash) are served from the on-disk cache.
+
+        Returns the cached file's path or the rewound output stream, both of
+        which DocxTranslator.translate_document_to_stream reads directly.
+        """
+        cache_path = self._cache_path(pdf_bytes)
+        if self._use_cached(cache_path):
+            logger.info(f"[PDF] Using cached pdf2docx conversion: {cache_path.name}")
+            return cache_path
+
+        docx_stream = io.BytesIO()
+        try:
+            with fitz.open(stream=pdf_bytes, filetype="pdf") as pdf_doc:
+                page_count = len(pdf_doc)
+            shards = max(1, (os.cpu_count() or 1) // 2)
+
+            if self.MULTI_PROCESSING and page_count >= self.PARALLEL_MIN_PAGES and shards > 1:
+                self._convert_multi_process(pdf_bytes, docx_stream, shards)
+            else:
+                logger.info(f"[PDF] Converting {page_count}-page PDF to DOCX in memory using pdf2docx")
+                cv = Converter(stream=pdf_bytes)
+                # start=0, end=None -> all pages
+                cv.convert(docx_stream, start=0, end=None)
+                cv.close()
+        except Exception as e:
+            logger.error(f"[PDF] pdf2docx conversion failed: {e}")
+            # If conversion fails, just return original PDF bytes
+            # Caller can handle this gracefully.
+            raise
 
-        return docx_bytes
+        self._store_in_cache(docx_stream, cache_path)
+        docx_stream.seek(0)
+        return docx_stream
 
-    def translate_document(
+    def translate_document_to_stream(
         self,
         filename: str,
-        content_bytes: bytes,
+        content: Union[bytes, BinaryIO, str, Path],
+        out_fileobj: BinaryIO,
         target_language: Optional[str] = None,
         target_dialect: Optional[str] = None,
-    ) -> bytes:
+    ) -> None:
         logger.info(f"Translating PDF via PDF→DOCX pipeline: {filename}")
+        if isinstance(content, (str, Path)):
+            pdf_bytes = Path(content).read_bytes()
+        elif isinstance(content, (bytes, bytearray)):
+            pdf_bytes = content
+        else:
+            pdf_bytes = content.read()
 
         # 1) Convert PDF -> DOCX
         try:
-            docx_bytes = self._pdf_bytes_to_docx_bytes(content_bytes)
+            docx_source = self._pdf_bytes_to_docx(pdf_bytes)
         except Exception:
             logger.error(
                 f"[PDF] Failed to convert '{filename}' to DOCX. "
                 f"Returning original PDF bytes unchanged."
             )
-            return content_bytes
+            out_fileobj.write(pdf_bytes)
+            return
 
         # 2) Use existing DocxTranslator with same OaiClient
         docx_translator = DocxTranslator(self.oai_client)
@@ -87,12 +193,11 @@ class PdfTranslator(BaseTranslator):
         # Derive a pseudo DOCX filename (for logging only)
         pseudo_docx_name = UtilityFunctions.replace_extension(filename, ".docx")
 
-        translated_docx_bytes = docx_translator.translate_document(
+        # 3) Write the translated DOCX (caller should name the output with .docx)
+        docx_translator.translate_document_to_stream(
             pseudo_docx_name,
-            docx_bytes,
+            docx_source,
+            out_fileobj,
             target_language=target_language,
             target_dialect=target_dialect,
         )
-
-        # 3) Return DOCX bytes (caller should name the output with .docx)
-        return translated_docx_bytes
@@ -1,11 +1,42 @@
 import io
-from typing import List, Dict, Optional
+import re
+from pathlib import Path
+from typing import BinaryIO, List, Dict, Optional, Tuple, Union
 
 from pptx import Presentation  # python-pptx
+from pptx.oxml.ns import qn
+from pptx.oxml.xmlchemy import BaseOxmlElement
 
 from .base_translator import BaseTranslator
 from ai_translation_logger import logger
-from ai_translation_utils import UtilityFunctions
+
+# Joins the runs of one paragraph into a single segment (U+241F SYMBOL FOR
+# UNIT SEPARATOR: visible to the model, practically never in real text).
+RUN_SEPARATOR = "\u241F"
+
+# Text with nothing to translate: only digits/punctuation/whitespace, a URL,
+# or an e-mail address. Such paragraphs are left as-is and never sent.
+# Tested on the joined text, so URLs and e-mails must not span RUN_SEPARATOR:
+# "Contact:" + "info@acme.com" still has a label to translate.
+_NONTRANSLATABLE = re.compile(r"^[\s\d\W_]*$|^https?://[^\s\u241F]*$|^[^\s\u241F]+@[^\s\u241F]+$")
+
+# DrawingML paragraph / run / text tags, resolved once
+_A_P = qn("a:p")
+_A_R = qn("a:r")
+_A_T = qn("a:t")
+
+
+def _keep_edge_whitespace(piece: str, source: str) -> str:
+    """
+    The model's spacing around RUN_SEPARATOR is unpredictable ("Hello " +
+    "world" can come back as "Bonjour␟monde"), so each piece gets the
+    leading/trailing whitespace of the run it replaces.
+    """
+    stripped = source.strip()
+    if not stripped:
+        return piece
+    start = source.index(stripped)
+    return source[:start] + piece.strip() + source[start + len(stripped):]
 
 
 class PptxTranslator(BaseTranslator):
@@ -13,139 +44,238 @@ class PptxTranslator(BaseTranslator):
     PPTX translator.
 
     Key points:
-    - We translate at RUN level inside paragraphs of:
-        - shape.text_frame.paragraphs[].runs
-        - table.cell.text_frame.paragraphs[].runs
-    - This preserves text formatting (font, size, color, etc.) and does not
-      remove shapes or images, because we never reassign paragraph.text or cell.text.
+    - We translate one segment per PARAGRAPH (<a:p>) anywhere in a slide:
+      text frames, table cells and shapes inside groups. Its runs are joined
+      with RUN_SEPARATOR; the translation is split back on the separator, one
+      piece per run, so the model sees the whole sentence but each run keeps
+      its formatting.
+    - Slides are walked with lxml directly rather than through python-pptx's
+      shape/paragraph/run proxies, and only <a:t> text is ever rewritten, so
+      formatting, shapes and images are preserved.
     """
 
     def can_handle(self, filename: str) -> bool:
-        return UtilityFunctions.get_extension(filename) == ".pptx"
+        return filename.lower().endswith(".pptx")
 
     # ------------------------------------------------------------------
     # Segment collection
     # ------------------------------------------------------------------
-    def _collect_segments(self, pres: Presentation) -> List[Dict[str, str]]:
+    def _collect_segments(
+        self, pres: Presentation
+    ) -> Tuple[List[Dict[str, str]], List[List[BaseOxmlElement]]]:
         """
-        Collect text segments at RUN level from all slides, shapes, and table cells.
+        Collect one text segment per paragraph from all slides.
         Each segment has:
-          { "id": <segment_id>, "text": <original_text> }
+          { "id": <segment_id>, "text": <run texts joined with RUN_SEPARATOR> }
+
+        Also returns the run index: each paragraph's <a:t> elements, in order.
+        Segment ids are the paragraph's position in it ("0", "1", ...), so
+        _apply_translations does not have to walk the deck again. Nothing is
+        kept on self: one instance may translate several decks at once.
         """
-        segments: List[Dict[str, str]] = []
-
-        for s_idx, slide in enumerate(pres.slides):
-            for sh_idx, shape in enumerate(slide.shapes):
-                # 1) Normal shapes with text
-                if shape.has_text_frame:
-                    text_frame = shape.text_frame
-                    for p_idx, paragraph in enumerate(text_frame.paragraphs):
-                        for r_idx, run in enumerate(paragraph.runs):
-                            text = run.text
-                            if text and text.strip():
-                                seg_id = (
-                                    f"s-{s_idx}-sh-{sh_idx}-p-{p_idx}-r-{r_idx}"
-                                )
-                                segments.append({"id": seg_id, "text": text})
-
-                # 2) Tables inside shapes
-                if shape.has_table:
-                    table = shape.table
-                    for row_idx, row in enumerate(table.rows):
-                        for col_idx, cell in enumerate(row.cells):
-                            # cell.text_frame holds the paragraphs
-                            text_frame = cell.text_frame
-                            for p_idx, paragraph in enumerate(text_frame.paragraphs):
-                                for r_idx, run in enumerate(paragraph.runs):
-                                    text = run.text
-                                    if text and text.strip():
-                                        seg_id = (
-                                            f"s-{s_idx}-sh-{sh_idx}-tbl-row-"
-                                            f"{row_idx}-col-{col_idx}-p-{p_idx}-r-{r_idx}"
-                                        )
-                                        segments.append({"id": seg_id, "text": text})
-
-        return segments
+        per_slide = [self._collect_slide(slide._element) for slide in pres.slides]
+
+        # Ids are assigned afterwards, in slide order, so they stay deterministic.
+        paragraphs = [paragraph for slide_paragraphs in per_slide for paragraph in slide_paragraphs]
+        segments = [{"id": str(i), "text": text} for i, (text, _) in enumerate(paragraphs)]
+        run_index = [t_elems for _, t_elems in paragraphs]
+
+        return segments, run_index
+
+    def _collect_slide(self, slide_elem: BaseOxmlElement) -> List[Tuple[str, List[BaseOxmlElement]]]:
+        """
+        (joined text, [<a:t>, ...]) for every translatable paragraph of one
+        slide, read from the slide's lxml subtree only.
+        """
+        paragraphs: List[Tuple[str, List[BaseOxmlElement]]] = []
+        for p_elem in slide_elem.iterdescendants(_A_P):
+            t_elems: List[BaseOxmlElement] = []
+            texts: List[str] = []
+            for r_elem in p_elem.iterchildren(_A_R):
+                t_elem = r_elem.find(_A_T)
+                if t_elem is None:
+                    continue
+                # Whitespace-only runs are left as they are and not sent;
+                # isspace() avoids building a stripped copy just to test it
+                run_text = t_elem.text
+                if run_text and not run_text.isspace():
+                    t_elems.append(t_elem)
+                    texts.append(run_text)
+
+            if t_elems:
+                text = RUN_SEPARATOR.join(texts)
+                if not _NONTRANSLATABLE.match(text):
+                    paragraphs.append((text, t_elems))
+        return paragraphs
 
     # ------------------------------------------------------------------
     # Apply translations back to the presentation
     # ------------------------------------------------------------------
     def _apply_translations(
         self,
-        pres: Presentation,
+        run_index: List[List[BaseOxmlElement]],
         id_to_translation: Dict[str, str],
-    ) -> None:
+    ) -> List[int]:
         """
-        Walk the PPT structure again and update run.text where we have translations.
+        Split each paragraph translation on RUN_SEPARATOR and update the <a:t> of each run.
+
+        Returns the run_index positions whose translation did not come back
+        with one piece per run; those are left untouched for a per-run retry.
         """
+        mismatched: List[int] = []
+        if not id_to_translation:
+            return mismatched
+
+        # Few translations (e.g. a partly failed request): visit only those
+        # positions instead of every collected paragraph
+        if len(id_to_translation) < len(run_index) // 4:
+            positions = sorted(int(seg_id) for seg_id in id_to_translation)
+        else:
+            positions = range(len(run_index))
 
-        for s_idx, slide in enumerate(pres.slides):
-            for sh_idx, shape in enumerate(slide.shapes):
-
-                # 1) Normal shape text
-                if shape.has_text_frame:
-                    text_frame = shape.text_frame
-                    for p_idx, paragraph in enumerate(text_frame.paragraphs):
-                        for r_idx, run in enumerate(paragraph.runs):
-                            text = run.text
-                            if not text or not text.strip():
-                                continue
-                            seg_id = (
-                                f"s-{s_idx}-sh-{sh_idx}-p-{p_idx}-r-{r_idx}"
-                            )
-                            if seg_id in id_to_translation:
-                                run.text = id_to_translation[seg_id]
-
-                # 2) Table text
-                if shape.has_table:
-                    table = shape.table
-                    for row_idx, row in enumerate(table.rows):
-                        for col_idx, cell in enumerate(row.cells):
-                            text_frame = cell.text_frame
-                            for p_idx, paragraph in enumerate(text_frame.paragraphs):
-                                for r_idx, run in enumerate(paragraph.runs):
-                                    text = run.text
-                                    if not text or not text.strip():
-                                        continue
-                                    seg_id = (
-                                        f"s-{s_idx}-sh-{sh_idx}-tbl-row-"
-                                        f"{row_idx}-col-{col_idx}-p-{p_idx}-r-{r_idx}"
-                                    )
-                                    if seg_id in id_to_translation:
-                                        run.text = id_to_translation[seg_id]
+        for i in positions:
+            translated = id_to_translation.get(str(i))
+            if translated is None:
+                continue
+            t_elems = run_index[i]
+            if len(t_elems) == 1:
+                # Untouched when the model returns the source text (names, codes)
+                if translated != t_elems[0].text:
+                    t_elems[0].text = translated
+                continue
+
+            parts = translated.split(RUN_SEPARATOR)
+            if len(parts) != len(t_elems):
+                mismatched.append(i)
+                continue
+            for t_elem, part in zip(t_elems, parts):
+                part = _keep_edge_whitespace(part, t_elem.text)
+                if part != t_elem.text:
+                    t_elem.text = part
+        return mismatched
+
+    def _translate_runs_individually(
+        self,
+        run_index: List[List[BaseOxmlElement]],
+        positions: List[int],
+        target_language: Optional[str] = None,
+        target_dialect: Optional[str] = None,
+    ) -> None:
+        """
+        Fallback for paragraphs whose joined translation lost or gained
+        separators: translate their runs one segment per run.
+        """
+        segments = [
+            {"id": f"{i}.{j}", "text": t_elem.text}
+            for i in positions
+            for j, t_elem in enumerate(run_index[i])
+        ]
+        logger.info(f"Re-translating {len(segments)} runs of {len(positions)} paragraphs one by one.")
+        id_to_translation = self.oai_client.translate_segments(
+            segments,
+            target_language=target_language,
+            target_dialect=target_dialect,
+        )
+        for i in positions:
+            for j, t_elem in enumerate(run_index[i]):
+                translated = id_to_translation.get(f"{i}.{j}")
+                if translated is not None and translated != t_elem.text:
+                    t_elem.text = translated
 
     # ------------------------------------------------------------------
     # Public entrypoint
     # ------------------------------------------------------------------
-    def translate_document(
+    def translate_document_to_stream(
         self,
         filename: str,
-        content_bytes: bytes,
+        content: Union[bytes, BinaryIO, str, Path],
+        out_fileobj: BinaryIO,
         target_language: Optional[str] = None,
         target_dialect: Optional[str] = None,
-    ) -> bytes:
+    ) -> None:
+        """
+        Same as translate_document, but saves the translated PPTX straight
+        into out_fileobj (e.g. an open file or upload stream).
+        content may be bytes, an open binary file, or a path; python-pptx
+        opens files and paths directly, without an in-memory copy.
+        """
         logger.info(f"Translating PPTX document: {filename}")
-        pres_stream = io.BytesIO(content_bytes)
-        pres = Presentation(pres_stream)
-
-        # 1) Collect run-level segments
-        segments = self._collect_segments(pres)
+        pres, run_index, segments, originals = self.load_once(content)
         if not segments:
             logger.info("No text segments found in PPTX, returning original document.")
-            return content_bytes
+            if isinstance(content, (bytes, bytearray)):
+                out_fileobj.write(content)
+            else:
+                pres.save(out_fileobj)
+            return
 
-        # 2) Call Azure OpenAI to translate
-        id_to_translation = self.oai_client.translate_segments(
+        self.apply_and_serialize(
+            pres,
+            run_index,
+            segments,
+            originals,
+            out_fileobj,
+            target_language=target_language,
+            target_dialect=target_dialect,
+        )
+
+    def load_once(
+        self,
+        content: Union[bytes, BinaryIO, str, Path],
+    ) -> Tuple[Presentation, List[List[BaseOxmlElement]], List[Dict[str, str]], List[List[str]]]:
+        """
+        Parse the deck and collect its segments once.
+
+        Returns (pres, run_index, segments, originals), where originals holds
+        the source text of every collected run. Pass the tuple to
+        apply_and_serialize once per target language instead of re-parsing
+        the PPTX for each one.
+        """
+        if isinstance(content, (bytes, bytearray)):
+            pres = Presentation(io.BytesIO(content))
+        else:
+            pres = Presentation(str(content) if isinstance(content, Path) else content)
+
+        segments, run_index = self._collect_segments(pres)
+        originals = [[t_elem.text for t_elem in t_elems] for t_elems in run_index]
+        return pres, run_index, segments, originals
+
+    def apply_and_serialize(
+        self,
+        pres: Presentation,
+        run_index: List[List[BaseOxmlElement]],
+        segments: List[Dict[str, str]],
+        originals: List[List[str]],
+        out_fileobj: BinaryIO,
+        target_language: Optional[str] = None,
+        target_dialect: Optional[str] = None,
+    ) -> None:
+        """
+        Translate a deck prepared by load_once into one language and save it
+        into out_fileobj. Runs are first reset to their source text, so the
+        same loaded deck can be reused for the next language.
+        """
+        for t_elems, texts in zip(run_index, originals):
+            for t_elem, text in zip(t_elems, texts):
+                if t_elem.text != text:
+                    t_elem.text = text
+
+        # 1) Call Azure OpenAI to translate (each distinct text once)
+        id_to_translation = self._translate_unique_segments(
             segments,
             target_language=target_language,
             target_dialect=target_dialect,
         )
 
-        # 3) Apply translations
-        self._apply_translations(pres, id_to_translation)
+        # 2) Apply translations
+        mismatched = self._apply_translations(run_index, id_to_translation)
+        if mismatched:
+            self._translate_runs_individually(
+                run_index,
+                mismatched,
+                target_language=target_language,
+                target_dialect=target_dialect,
+            )
 
-        # 4) Save to bytes
-        out_stream = io.BytesIO()
-        pres.save(out_stream)
-        out_stream.seek(0)
-        return out_stream.read()
+        # 3) Save
+        pres.save(out_fileobj)